@@ -1,17 +1,27 @@
-import json
-import uuid
-from datetime import datetime, timezone
-from fastapi import FastAPI, Depends, HTTPException, status, Header
+import secrets
+import tempfile
+from datetime import datetime, timezone, timedelta
+from fastapi import FastAPI, Depends, HTTPException, status, Header, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import List, Dict, Annotated, Optional
-import aiofiles
 # --- добавлено для SQLAlchemy ---
-from sqlalchemy import create_engine, Column, String, DateTime, ForeignKey, Integer, UniqueConstraint
+from sqlalchemy import event, inspect, select, delete, tuple_, lambda_stmt, Column, String, DateTime, ForeignKey, Integer, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship, Session
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import relationship
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 import os
 from fastapi import Response
+import orjson
+import redis.asyncio as redis
+from redis.exceptions import RedisError
+import jwt
+from dotenv import load_dotenv
+from ulid import ULID
+
+load_dotenv()
 
 app = FastAPI()
 
@@ -21,11 +31,73 @@ app.add_middleware(CORSMiddleware, allow_origins=origins, allow_credentials=True
 
 # --- SQLAlchemy setup ---
 DB_PATH = os.path.join(os.path.dirname(__file__), "data", "app.db")
-SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
-engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SQLALCHEMY_DATABASE_URL = f"sqlite+aiosqlite:///{DB_PATH}"
+# Асинхронный движок: aiosqlite выполняет запросы в своём потоке, event loop не блокируется.
+# Пул соединений у каждого воркера uvicorn свой: соединения (и их кеш страниц SQLite)
+# переиспользуются между запросами, а не открываются заново
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    poolclass=AsyncAdaptedQueuePool,
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,
+)
+
+# WAL: читатели не блокируются записью; остальное - меньше fsync и больше кеша страниц
+SQLITE_PRAGMAS = (
+    "journal_mode=WAL",
+    "synchronous=NORMAL",
+    "temp_store=MEMORY",
+    "cache_size=-64000",  # ~64 МБ
+    "mmap_size=268435456",  # 256 МБ
+)
+
+@event.listens_for(engine.sync_engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(f"PRAGMA {pragma}")
+    cursor.close()
+
+SessionLocal = async_sessionmaker(engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+# --- Кеш ленты в Redis (включается переменной окружения REDIS_URL) ---
+REDIS_URL = os.environ.get("REDIS_URL")
+redis_client = redis.from_url(REDIS_URL) if REDIS_URL else None
+FEED_CACHE_TTL = 30  # секунд
+# Любое изменение постов/лайков увеличивает поколение - все закешированные ленты
+# (общая и персональные, с liked_by_me) разом становятся неактуальными
+FEED_GENERATION_KEY = "feed:generation"
+
+async def feed_cache_get(user_id: Optional[str], limit: int):
+    # возвращает (ключ, закешированный JSON); при недоступном Redis работаем без кеша
+    if redis_client is None:
+        return None, None
+    try:
+        generation = int(await redis_client.get(FEED_GENERATION_KEY) or 0)
+        key = f"feed:user:{user_id}:v{generation}" if user_id else f"feed:global:v{generation}"
+        key += f":limit:{limit}"
+        return key, await redis_client.get(key)
+    except RedisError:
+        return None, None
+
+async def feed_cache_set(key: Optional[str], body: bytes):
+    if redis_client is None or key is None:
+        return
+    try:
+        await redis_client.set(key, body, ex=FEED_CACHE_TTL)
+    except RedisError:
+        pass
+
+async def invalidate_feed_cache():
+    if redis_client is None:
+        return
+    try:
+        await redis_client.incr(FEED_GENERATION_KEY)
+    except RedisError:
+        pass
+
 # --- Модели SQLAlchemy ---
 class UserDB(Base):
     __tablename__ = "users"
@@ -42,17 +114,36 @@ class PostDB(Base):
     timestamp = Column(DateTime, default=datetime.utcnow)
     owner_id = Column(String, ForeignKey("users.id"), nullable=False)
     owner_username = Column(String, nullable=False)
+    # счётчик лайков поддерживают триггеры на likes (см. ниже), лента не считает COUNT(*)
+    likes_count = Column(Integer, nullable=False, default=0, server_default="0")
     owner = relationship("UserDB", back_populates="posts")
     likes = relationship("LikeDB", back_populates="post")
+    # ленты читаются сразу в порядке (timestamp, id) - без сортировки при запросе
+    __table_args__ = (
+        Index("ix_posts_timestamp_id", timestamp.desc(), id.desc()),
+        Index("ix_posts_owner_timestamp", owner_id, timestamp.desc(), id.desc()),
+    )
 
 class LikeDB(Base):
     __tablename__ = "likes"
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
-    post_id = Column(String, ForeignKey("posts.id"), nullable=False)
+    # (user_id, post_id) - первичный ключ и он же запрет повторного лайка;
+    # WITHOUT ROWID: строки хранятся прямо в B-дереве ключа, без отдельного rowid
+    user_id = Column(String, ForeignKey("users.id"), primary_key=True)
+    post_id = Column(String, ForeignKey("posts.id"), primary_key=True)
     user = relationship("UserDB", back_populates="likes")
     post = relationship("PostDB", back_populates="likes")
-    __table_args__ = (UniqueConstraint('user_id', 'post_id', name='_user_post_uc'),)
+    __table_args__ = (
+        Index('ix_likes_post_user', 'post_id', 'user_id'),
+        {"sqlite_with_rowid": False},
+    )
+
+# Триггеры создаются при старте (migrate_schema) - и для новой базы, и для уже существующей
+LIKES_TRIGGERS = (
+    "CREATE TRIGGER IF NOT EXISTS likes_after_insert AFTER INSERT ON likes BEGIN "
+    "UPDATE posts SET likes_count = likes_count + 1 WHERE id = NEW.post_id; END",
+    "CREATE TRIGGER IF NOT EXISTS likes_after_delete AFTER DELETE ON likes BEGIN "
+    "UPDATE posts SET likes_count = likes_count - 1 WHERE id = OLD.post_id; END",
+)
 
 # --- Pydantic модели ---
 class Post(BaseModel):
@@ -61,8 +152,7 @@ class Post(BaseModel):
     timestamp: datetime
     owner_id: str
     owner_username: str
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
 class PostCreate(BaseModel):
     text: str
@@ -70,158 +160,302 @@ class PostCreate(BaseModel):
 class User(BaseModel):
     id: str
     username: str
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True, frozen=True)
 
+# Схема ответа лент для OpenAPI; сами ленты собираются словарями и сериализуются orjson
+# (post_with_likes_dict) - это в несколько раз быстрее валидации и dump_json через Pydantic
 class PostWithLikes(Post):
     likes_count: int
     liked_by_me: Optional[bool] = False
 
 # --- Фейковые данные пользователей (для аутентификации) ---
+# В проде посев отключается переменной окружения SEED_USERS=0
+SEED_USERS = os.environ.get("SEED_USERS", "1") != "0"
 FAKE_USERS_DB = {
     "user1": {"id": "1", "username": "user1", "password": "password1"},
     "user2": {"id": "2", "username": "user2", "password": "password2"},
 }
 
 # --- Создание таблиц и начальных пользователей ---
+def migrate_schema(sync_conn):
+    # create_all не меняет уже существующие таблицы: базу старой схемы доводим здесь, без потери данных
+    inspector = inspect(sync_conn)
+    likes_pk = set(inspector.get_pk_constraint("likes")["constrained_columns"])
+    if likes_pk != {"user_id", "post_id"}:
+        # старая likes (rowid + id) переименовывается, новая создаётся по модели
+        # (WITHOUT ROWID, ключ (user_id, post_id)) и заполняется INSERT ... SELECT
+        old_indexes = [index["name"] for index in inspector.get_indexes("likes")]
+        sync_conn.exec_driver_sql("ALTER TABLE likes RENAME TO likes_old")
+        for name in old_indexes:
+            # индексы уезжают вместе с таблицей, а их имена нужны новой
+            sync_conn.exec_driver_sql(f'DROP INDEX "{name}"')
+        LikeDB.__table__.create(sync_conn)
+        sync_conn.exec_driver_sql("INSERT INTO likes (user_id, post_id) SELECT DISTINCT user_id, post_id FROM likes_old")
+        sync_conn.exec_driver_sql("DROP TABLE likes_old")
+    post_columns = {column["name"] for column in inspector.get_columns("posts")}
+    if "likes_count" not in post_columns:
+        sync_conn.exec_driver_sql("ALTER TABLE posts ADD COLUMN likes_count INTEGER NOT NULL DEFAULT 0")
+        sync_conn.exec_driver_sql("UPDATE posts SET likes_count = (SELECT COUNT(*) FROM likes WHERE likes.post_id = posts.id)")
+    # create_all строит индексы только для таблиц, которые создаёт сам
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(sync_conn, checkfirst=True)
+    for trigger in LIKES_TRIGGERS:
+        sync_conn.exec_driver_sql(trigger)
+
+def check_schema(sync_conn):
+    # проверка после миграции: на несовпадающей схеме лента падала бы на каждом запросе
+    inspector = inspect(sync_conn)
+    post_columns = {column["name"] for column in inspector.get_columns("posts")}
+    likes_pk = set(inspector.get_pk_constraint("likes")["constrained_columns"])
+    triggers = set(sync_conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'trigger'").scalars())
+    indexes = set(sync_conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'index'").scalars())
+    model_indexes = {index.name for table in Base.metadata.sorted_tables for index in table.indexes}
+    if (
+        "likes_count" not in post_columns
+        or likes_pk != {"user_id", "post_id"}
+        or not {"likes_after_insert", "likes_after_delete"} <= triggers
+        or not model_indexes <= indexes
+    ):
+        raise RuntimeError(f"Схема базы {DB_PATH} не совпадает с моделями после миграции")
+
 @app.on_event("startup")
-def on_startup():
-    Base.metadata.create_all(bind=engine)
-    db = SessionLocal()
-    for u in FAKE_USERS_DB.values():
-        if not db.query(UserDB).filter_by(username=u["username"]).first():
-            db.add(UserDB(id=u["id"], username=u["username"], password=u["password"]))
-    db.commit()
-    db.close()
+async def on_startup():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(migrate_schema)
+        await conn.run_sync(check_schema)
+        if not SEED_USERS:
+            return
+        # один INSERT ... ON CONFLICT DO NOTHING вместо SELECT + INSERT на каждого пользователя
+        await conn.execute(
+            sqlite_insert(UserDB)
+            .values([{"id": u["id"], "username": u["username"], "password": u["password"]} for u in FAKE_USERS_DB.values()])
+            .on_conflict_do_nothing()
+        )
 
-# --- Dependency ---
-def get_db():
-    db = SessionLocal()
+# --- Сессия БД на запрос ---
+@app.middleware("http")
+async def db_session_middleware(request: Request, call_next):
+    # сессия открывается middleware и закрывается после ответа;
+    # незакоммиченные изменения при закрытии откатываются
+    request.state.db = SessionLocal()
     try:
-        yield db
+        return await call_next(request)
     finally:
-        db.close()
+        await request.state.db.close()
+
+# --- Dependency ---
+def get_db(request: Request) -> AsyncSession:
+    return request.state.db
+
+# --- Частые запросы ---
+async def get_user_by_username(db: AsyncSession, username: str) -> Optional[UserDB]:
+    return (await db.execute(lambda_stmt(lambda: select(UserDB).where(UserDB.username == username)))).scalar_one_or_none()
+
+async def post_exists(db: AsyncSession, post_id: str) -> bool:
+    return (await db.execute(lambda_stmt(lambda: select(PostDB.id).where(PostDB.id == post_id)))).scalar_one_or_none() is not None
 
 # --- Аутентификация ---
-async def get_current_user(authorization: Annotated[str, Header()], db: Session = Depends(get_db)) -> User:
+# Токен - JWT, подписанный HMAC-SHA256: id и username берутся из него, без запроса к БД.
+SECRET_KEY_PATH = os.path.join(os.path.dirname(__file__), "data", "secret_key")
+
+def load_secret_key() -> str:
+    # Ключ берётся из SECRET_KEY; без него генерируется один раз и хранится в data/ (не в git),
+    # чтобы токены переживали перезагрузку `fastapi dev` и подходили ко всем воркерам
+    if os.environ.get("SECRET_KEY"):
+        return os.environ["SECRET_KEY"]
+    os.makedirs(os.path.dirname(SECRET_KEY_PATH), exist_ok=True)
+    if not os.path.exists(SECRET_KEY_PATH):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(SECRET_KEY_PATH))
+        with os.fdopen(fd, "w") as f:
+            f.write(secrets.token_urlsafe(32))
+        try:
+            # link атомарен и не перезаписывает: если другой воркер успел первым, берём его ключ
+            os.link(tmp_path, SECRET_KEY_PATH)
+        except FileExistsError:
+            pass
+        finally:
+            os.remove(tmp_path)
+    with open(SECRET_KEY_PATH) as f:
+        return f.read().strip()
+
+SECRET_KEY = load_secret_key()
+JWT_ALGORITHM = "HS256"
+ACCESS_TOKEN_TTL = timedelta(days=1)
+
+def create_access_token(user: UserDB) -> str:
+    payload = {"sub": user.id, "u": user.username, "exp": datetime.now(timezone.utc) + ACCESS_TOKEN_TTL}
+    return jwt.encode(payload, SECRET_KEY, algorithm=JWT_ALGORITHM)
+
+async def resolve_optional_user(request: Request, authorization: Optional[str] = Header(None)) -> Optional[User]:
+    # токен проверяется один раз за запрос, результат запоминается в request.state
+    if hasattr(request.state, "user"):
+        return request.state.user
+    user = None
+    if authorization and authorization.startswith("Bearer "):
+        token = authorization.split(" ")[1]
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[JWT_ALGORITHM])
+            user = User(id=payload["sub"], username=payload["u"])
+        except jwt.InvalidTokenError:
+            user = None
+    request.state.user = user
+    return user
+
+async def get_current_user(authorization: Annotated[str, Header()], user: Optional[User] = Depends(resolve_optional_user)) -> User:
     if not authorization.startswith("Bearer "):
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid scheme")
-    token = authorization.split(" ")[1] # токен - это просто username
-    user_db = db.query(UserDB).filter_by(username=token).first()
-    if not user_db:
+    if not user:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Invalid token")
-    return User.from_orm(user_db)
+    return user
 
 @app.post("/api/login")
-async def login(form_data: Dict[str, str], db: Session = Depends(get_db)):
+async def login(form_data: Dict[str, str], db: AsyncSession = Depends(get_db)):
     username = form_data.get("username")
     password = form_data.get("password")
-    user = db.query(UserDB).filter_by(username=username).first()
+    user = await get_user_by_username(db, username)
     if not user or user.password != password:
         raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Incorrect username or password")
-    return {"access_token": user.username, "token_type": "bearer", "user": {"id": user.id, "username": user.username}}
+    return {"access_token": create_access_token(user), "token_type": "bearer", "user": {"id": user.id, "username": user.username}}
+
+# --- Лента: посты вместе с лайками без ленивых запросов ---
+def feed_stmt(limit: int, before: Optional[datetime], before_id: Optional[str], owner_id: Optional[str] = None):
+    # lambda_stmt: SQL собирается и кешируется по месту лямбд один раз,
+    # значения из замыканий (owner_id, курсор, limit) уходят параметрами
+    stmt = lambda_stmt(lambda: select(PostDB))
+    if owner_id:
+        stmt += lambda s: s.where(PostDB.owner_id == owner_id)
+    # keyset-пагинация: следующая страница начинается после (timestamp, id) последнего поста
+    if before is not None:
+        if before.tzinfo is not None:
+            # время хранится в UTC без часового пояса
+            before = before.astimezone(timezone.utc).replace(tzinfo=None)
+        if before_id is not None:
+            stmt += lambda s: s.where(tuple_(PostDB.timestamp, PostDB.id) < tuple_(before, before_id))
+        else:
+            stmt += lambda s: s.where(PostDB.timestamp < before)
+    stmt += lambda s: s.order_by(PostDB.timestamp.desc(), PostDB.id.desc()).limit(limit)
+    return stmt
+
+async def liked_post_ids(db: AsyncSession, user_id: str, post_ids: List[str]) -> set:
+    # какие из постов страницы лайкнул текущий пользователь - один запрос на страницу
+    stmt = lambda_stmt(lambda: select(LikeDB.post_id).where(LikeDB.user_id == user_id, LikeDB.post_id.in_(post_ids)))
+    return set((await db.execute(stmt)).scalars())
+
+def post_with_likes_dict(post: PostDB, liked_ids: set) -> dict:
+    # горячий путь: словарь в форме PostWithLikes сразу уходит в orjson, без модели Pydantic
+    return {
+        "id": post.id,
+        "text": post.text,
+        "timestamp": post.timestamp,
+        "owner_id": post.owner_id,
+        "owner_username": post.owner_username,
+        "likes_count": post.likes_count,
+        "liked_by_me": post.id in liked_ids,
+    }
+
+def orjson_response(body: bytes) -> Response:
+    return Response(content=body, media_type="application/json")
+
+async def read_feed(db: AsyncSession, stmt, user_id: Optional[str]) -> bytes:
+    # страница ограничена limit (<= 100), поэтому читается целиком, а сессия закрывается
+    # до отправки ответа: медленный клиент не держит соединение пула и снимок WAL
+    # likes_count хранится в самом посте, лайки подгружаются только для liked_by_me
+    posts = (await db.execute(stmt)).scalars().all()
+    liked_ids = await liked_post_ids(db, user_id, [post.id for post in posts]) if user_id and posts else set()
+    body = orjson.dumps([post_with_likes_dict(post, liked_ids) for post in posts])
+    await db.close()
+    return body
 
 # --- Эндпоинты для постов ---
 @app.get("/api/posts", response_model=List[PostWithLikes])
-async def list_posts(db: Session = Depends(get_db), authorization: Optional[str] = Header(None)):
-    posts = db.query(PostDB).order_by(PostDB.timestamp.desc()).all()
-    user_id = None
-    if authorization and authorization.startswith("Bearer "):
-        token = authorization.split(" ")[1]
-        user = db.query(UserDB).filter_by(username=token).first()
-        if user:
-            user_id = user.id
-    result = []
-    for post in posts:
-        likes_count = db.query(LikeDB).filter_by(post_id=post.id).count()
-        liked_by_me = False
-        if user_id:
-            liked_by_me = db.query(LikeDB).filter_by(post_id=post.id, user_id=user_id).first() is not None
-        result.append(PostWithLikes(
-            id=post.id,
-            text=post.text,
-            timestamp=post.timestamp,
-            owner_id=post.owner_id,
-            owner_username=post.owner_username,
-            likes_count=likes_count,
-            liked_by_me=liked_by_me
-        ))
-    return result
+async def list_posts(
+    db: AsyncSession = Depends(get_db),
+    viewer: Optional[User] = Depends(resolve_optional_user),
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[datetime] = None,
+    before_id: Optional[str] = None,
+):
+    user_id = viewer.id if viewer else None
+    # кешируется только первая страница ленты
+    cache_key, cached = await feed_cache_get(user_id, limit) if before is None else (None, None)
+    if cached is not None:
+        return orjson_response(cached)
+    stmt = feed_stmt(limit, before, before_id)
+    body = await read_feed(db, stmt, user_id)
+    await feed_cache_set(cache_key, body)
+    return orjson_response(body)
 
 @app.post("/api/posts", response_model=Post, status_code=201)
-async def create_post(post_data: PostCreate, current_user: Annotated[User, Depends(get_current_user)], db: Session = Depends(get_db)):
+async def create_post(post_data: PostCreate, current_user: Annotated[User, Depends(get_current_user)], db: AsyncSession = Depends(get_db)):
     new_post = PostDB(
-        id=str(uuid.uuid4()),
+        id=str(ULID()),  # ULID растёт со временем: новые посты ложатся в конец B-дерева ключа
         text=post_data.text,
         timestamp=datetime.now(timezone.utc),
         owner_id=current_user.id,
         owner_username=current_user.username
     )
     db.add(new_post)
-    db.commit()
-    db.refresh(new_post)
+    await db.commit()
+    await db.refresh(new_post)
+    await invalidate_feed_cache()
     return new_post
 
 @app.delete("/api/posts/{post_id}", status_code=204)
-async def delete_post(post_id: str, current_user: Annotated[User, Depends(get_current_user)], db: Session = Depends(get_db)):
-    post = db.query(PostDB).filter_by(id=post_id).first()
-    if not post:
-        raise HTTPException(status.HTTP_404_NOT_FOUND, "Post not found")
-    if post.owner_id != current_user.id:
+async def delete_post(post_id: str, current_user: Annotated[User, Depends(get_current_user)], db: AsyncSession = Depends(get_db)):
+    # проверка владельца прямо в DELETE - один запрос вместо SELECT + DELETE
+    result = await db.execute(delete(PostDB).where(PostDB.id == post_id, PostDB.owner_id == current_user.id))
+    if result.rowcount == 0:
+        # ничего не удалили: выясняем причину только в этом (редком) случае
+        exists = await post_exists(db, post_id)
+        if not exists:
+            raise HTTPException(status.HTTP_404_NOT_FOUND, "Post not found")
         raise HTTPException(status.HTTP_403_FORBIDDEN, "Not authorized to delete this post")
-    db.delete(post)
-    db.commit()
+    await db.execute(delete(LikeDB).where(LikeDB.post_id == post_id))
+    await db.commit()
+    await invalidate_feed_cache()
 
 # --- Эндпоинты для лайков ---
 @app.post("/api/posts/{post_id}/like", status_code=201)
-async def like_post(post_id: str, current_user: Annotated[User, Depends(get_current_user)], db: Session = Depends(get_db)):
-    post = db.query(PostDB).filter_by(id=post_id).first()
-    if not post:
+async def like_post(post_id: str, current_user: Annotated[User, Depends(get_current_user)], db: AsyncSession = Depends(get_db)):
+    exists = await post_exists(db, post_id)
+    if not exists:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Post not found")
-    # Проверяем, лайкал ли уже
-    like = db.query(LikeDB).filter_by(user_id=current_user.id, post_id=post_id).first()
-    if like:
+    # повторный лайк отсекает первичный ключ (user_id, post_id) - без отдельной проверки и гонок
+    result = await db.execute(
+        sqlite_insert(LikeDB)
+        .values(user_id=current_user.id, post_id=post_id)
+        .on_conflict_do_nothing(index_elements=["user_id", "post_id"])
+    )
+    if result.rowcount == 0:
         raise HTTPException(status.HTTP_400_BAD_REQUEST, "Already liked")
-    new_like = LikeDB(user_id=current_user.id, post_id=post_id)
-    db.add(new_like)
-    db.commit()
+    await db.commit()
+    await invalidate_feed_cache()
     return {"message": "Liked"}
 
 @app.delete("/api/posts/{post_id}/like", status_code=204)
-async def unlike_post(post_id: str, current_user: Annotated[User, Depends(get_current_user)], db: Session = Depends(get_db)):
-    like = db.query(LikeDB).filter_by(user_id=current_user.id, post_id=post_id).first()
-    if not like:
+async def unlike_post(post_id: str, current_user: Annotated[User, Depends(get_current_user)], db: AsyncSession = Depends(get_db)):
+    result = await db.execute(delete(LikeDB).where(LikeDB.user_id == current_user.id, LikeDB.post_id == post_id))
+    if result.rowcount == 0:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "Like not found")
-    db.delete(like)
-    db.commit()
+    await db.commit()
+    await invalidate_feed_cache()
     return Response(status_code=204)
 
 # --- Эндпоинт для получения постов пользователя ---
 @app.get("/api/users/{username}/posts", response_model=List[PostWithLikes])
-async def get_user_posts(username: str, db: Session = Depends(get_db), authorization: Optional[str] = Header(None)):
-    user = db.query(UserDB).filter_by(username=username).first()
+async def get_user_posts(
+    username: str,
+    db: AsyncSession = Depends(get_db),
+    viewer: Optional[User] = Depends(resolve_optional_user),
+    limit: int = Query(20, ge=1, le=100),
+    before: Optional[datetime] = None,
+    before_id: Optional[str] = None,
+):
+    user = await get_user_by_username(db, username)
     if not user:
         raise HTTPException(status.HTTP_404_NOT_FOUND, "User not found")
-    posts = db.query(PostDB).filter_by(owner_id=user.id).order_by(PostDB.timestamp.desc()).all()
-    user_id = None
-    if authorization and authorization.startswith("Bearer "):
-        token = authorization.split(" ")[1]
-        auth_user = db.query(UserDB).filter_by(username=token).first()
-        if auth_user:
-            user_id = auth_user.id
-    result = []
-    for post in posts:
-        likes_count = db.query(LikeDB).filter_by(post_id=post.id).count()
-        liked_by_me = False
-        if user_id:
-            liked_by_me = db.query(LikeDB).filter_by(post_id=post.id, user_id=user_id).first() is not None
-        result.append(PostWithLikes(
-            id=post.id,
-            text=post.text,
-            timestamp=post.timestamp,
-            owner_id=post.owner_id,
-            owner_username=post.owner_username,
-            likes_count=likes_count,
-            liked_by_me=liked_by_me
-        ))
-    return result
\ No newline at end of file
+    user_id = viewer.id if viewer else None
+    stmt = feed_stmt(limit, before, before_id, owner_id=user.id)
+    return orjson_response(await read_feed(db, stmt, user_id))
@@ -15,18 +15,25 @@ interface Post {
 interface User { id: string; username: string; }
 
 const API_URL = 'http://localhost:8000/api';
+const PAGE_SIZE = 20;
 
 export default function HomePage() {
   const [posts, setPosts] = useState<Post[]>([]);
   const [newPostText, setNewPostText] = useState('');
   const [user, setUser] = useState<User | null>(null);
+  const [hasMore, setHasMore] = useState(false);
   const router = useRouter();
 
-  const fetchPosts = async () => {
+  // Без lastPost загружается первая страница ленты, с ним - следующая после этого поста
+  const fetchPosts = async (lastPost?: Post) => {
     try {
       const token = localStorage.getItem('auth_token');
-      const res = await axios.get(`${API_URL}/posts`, token ? { headers: { Authorization: `Bearer ${token}` } } : {});
-      setPosts(res.data);
+      const params = lastPost
+        ? { limit: PAGE_SIZE, before: lastPost.timestamp, before_id: lastPost.id }
+        : { limit: PAGE_SIZE };
+      const res = await axios.get(`${API_URL}/posts`, { params, headers: token ? { Authorization: `Bearer ${token}` } : {} });
+      setPosts(prev => (lastPost ? [...prev, ...res.data] : res.data));
+      setHasMore(res.data.length === PAGE_SIZE);
     } catch (error) { console.error("Failed to fetch posts:", error); }
   };
 
@@ -60,7 +67,7 @@ export default function HomePage() {
     if (window.confirm("Вы уверены, что хотите удалить этот пост?")) {
         try {
             await axios.delete(`${API_URL}/posts/${postId}`, { headers: { Authorization: `Bearer ${token}` } });
-            fetchPosts(); // Обновляем ленту
+            setPosts(prev => prev.filter(post => post.id !== postId)); // Загруженные страницы сохраняются
         } catch (error) { console.error("Failed to delete post:", error); }
     }
   };
@@ -74,7 +81,10 @@ export default function HomePage() {
       } else {
         await axios.delete(`${API_URL}/posts/${postId}/like`, { headers: { Authorization: `Bearer ${token}` } });
       }
-      fetchPosts();
+      // Обновляем пост на месте, чтобы не сбрасывать загруженные страницы
+      setPosts(prev => prev.map(post => post.id === postId
+        ? { ...post, liked_by_me: !liked, likes_count: post.likes_count + (liked ? -1 : 1) }
+        : post));
     } catch (error) { console.error("Failed to like/unlike post:", error); }
   };
 
@@ -124,6 +134,10 @@ export default function HomePage() {
           </div>
         ))}
       </div>
+
+      {hasMore && (
+        <button onClick={() => fetchPosts(posts[posts.length - 1])} className="w-full mt-4 bg-gray-200 hover:bg-gray-300 p-2 rounded">Показать ещё</button>
+      )}
     </div>
   );
 }
\ No newline at end of file
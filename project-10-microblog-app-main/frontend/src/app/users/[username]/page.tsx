@@ -14,6 +14,7 @@ interface Post {
 }
 
 const API_URL = "http://localhost:8000/api";
+const PAGE_SIZE = 20;
 
 export default function UserProfilePage() {
   const params = useParams();
@@ -21,12 +22,18 @@ export default function UserProfilePage() {
   const username = params?.username as string;
   const [posts, setPosts] = useState<Post[]>([]);
   const [loading, setLoading] = useState(true);
+  const [hasMore, setHasMore] = useState(false);
 
-  const fetchPosts = async () => {
+  // Без lastPost загружается первая страница постов, с ним - следующая после этого поста
+  const fetchPosts = async (lastPost?: Post) => {
     try {
       const token = localStorage.getItem("auth_token");
-      const res = await axios.get(`${API_URL}/users/${username}/posts`, token ? { headers: { Authorization: `Bearer ${token}` } } : {});
-      setPosts(res.data);
+      const params = lastPost
+        ? { limit: PAGE_SIZE, before: lastPost.timestamp, before_id: lastPost.id }
+        : { limit: PAGE_SIZE };
+      const res = await axios.get(`${API_URL}/users/${username}/posts`, { params, headers: token ? { Authorization: `Bearer ${token}` } : {} });
+      setPosts(prev => (lastPost ? [...prev, ...res.data] : res.data));
+      setHasMore(res.data.length === PAGE_SIZE);
     } catch (error) {
       if (axios.isAxiosError(error) && error.response?.status === 404) {
         router.replace("/home");
@@ -51,7 +58,10 @@ export default function UserProfilePage() {
       } else {
         await axios.delete(`${API_URL}/posts/${postId}/like`, { headers: { Authorization: `Bearer ${token}` } });
       }
-      fetchPosts();
+      // Обновляем пост на месте, чтобы не сбрасывать загруженные страницы
+      setPosts(prev => prev.map(post => post.id === postId
+        ? { ...post, liked_by_me: !liked, likes_count: post.likes_count + (liked ? -1 : 1) }
+        : post));
     } catch (error) { }
   };
 
@@ -84,6 +94,9 @@ export default function UserProfilePage() {
           ))}
         </div>
       )}
+      {hasMore && (
+        <button onClick={() => fetchPosts(posts[posts.length - 1])} className="w-full mt-4 bg-gray-200 hover:bg-gray-300 p-2 rounded">Показать ещё</button>
+      )}
     </div>
   );
 } 
\ No newline at end of file